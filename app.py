@@ -2,7 +2,7 @@ from dash import Dash, html, dcc, Input, Output, State, ctx, no_update, dash_tab
 import sys
 import pickle
 import pandas as pd
-from src.plot_graph import plot_subgraph,collapse_names
+from src.plot_graph import plot_subgraph,collapse_names,index_subgraph,neighbor_records
 
 graph_file = sys.argv[1]
 node_df = None
@@ -194,37 +194,18 @@ def update_graph_data (subgraph_index, click_data, hover_data, active_cell):
 				"node_id": clicked_node_id
 			}
 
-			data["neighbors"] = []
+			# Get the neighboring nodes and edges of the clicked node
+			node_rows,adjacency = index_subgraph(node_subdf, edge_subdf)
+			records = neighbor_records(node_subdf, clicked_node_id, node_rows, adjacency)
 
-			neighbor_is_hovered = False
+			data["neighbors"] = [{
+					"point_index": record["point_index"],
+					"edge_id": record["edge_id"],
+					"node_id": record["id"]
+				} for record in records]
 
-			# Get connected edges for clicked node
-			adj_edges = edge_subdf[(edge_subdf['source'].eq(clicked_node_id)) | (edge_subdf['target'].eq(clicked_node_id))]
-
-			# For each edge, get the neighboring node and edge information
-			records = []
-			for edge_id,edge in adj_edges.iterrows():
-
-				# Find the neighboring node based on the clicked node
-				adj_node_id = edge["source"]
-				if edge["source"] == clicked_node_id:
-					adj_node_id = edge["target"]
-
-				# Iterate through nodes by row
-				#    Note that the node row does not necessarily equal the node index
-
-				for node_row,node_id in enumerate(node_subdf["node"]):
-					if adj_node_id == node_id:
-
-						data["neighbors"].append({
-							"point_index": node_row,
-							"edge_id": edge_id,
-							"node_id": node_id
-						})
-
-						# Check if the hovered node is part of the neighbors
-						if node_row == hover_index:
-							neighbor_is_hovered = True
+			# Check if the hovered node is part of the neighbors
+			neighbor_is_hovered = any(record["point_index"] == hover_index for record in records)
 
 			# For click/active cell triggers, return data
 			if trigger != "fig.hoverData":
@@ -293,24 +274,8 @@ def update_edge_table (graph_data):
 		node_subdf = node_df[node_df['subgraph'].eq(subgraph_index)]
 		edge_subdf = edge_df[edge_df['subgraph'].eq(subgraph_index)]
 
-		# Iterate through neighbors
-
-		for neighbor_row,neighbor in enumerate(graph_data["neighbors"]):
-			edge_id = neighbor["edge_id"]
-			node_id = neighbor["node_id"]
-			node_row = neighbor["point_index"]
-
-			edge = edge_subdf.loc[edge_id]
-			node = node_subdf.iloc[node_row,:]
-
-			records.append({
-				"id": node_id,
-				"Name": collapse_names(node["name"], sep="\n"), 
-				"Node weight": "{:10.3f}".format(node["weight"]),
-				"Edge weight": "{:10.3f}".format(edge["weight"])
-			})
-
-		records = sorted(records, key = lambda x: x["Edge weight"], reverse=True) 
+		node_rows,adjacency = index_subgraph(node_subdf, edge_subdf)
+		records = neighbor_records(node_subdf, graph_data["current"]["node_id"], node_rows, adjacency)
 
 		# Move hovered node row to top of the table
 		if "hover" in graph_data:
@@ -1,17 +1,25 @@
 from src.blast_to_graph import blast_to_graph
+from src.export_graph import export_graph
+from src.open_input import open_input, is_plain_file, strip_extensions
 import subprocess
 import os
 import sys
 import argparse
 import multiprocessing
+import shutil
 
 def main(arguments):
 
 	parser = argparse.ArgumentParser()
-	parser.add_argument("-f", "--file", help="FASTA file", required=True)
-	parser.add_argument("-d", "--db", help="BLAST database", required=True)
+	parser.add_argument("-f", "--file", help="FASTA file, optionally compressed, or - for stdin")
+	parser.add_argument("-b", "--blast", help="Existing BLAST results (outfmt 6), optionally compressed, or - for stdin. Skips running BLAST")
+	parser.add_argument("-d", "--db", help="BLAST database (required when running BLAST)")
+	parser.add_argument("-o", "--out", help="Output prefix (default: input file name without extensions)")
 	parser.add_argument("-e", "--evalue", help="BLAST E-value (default: 1e-80)", default="1e-80")
 	parser.add_argument("-t", "--threads", help="Number of threads (default: 0, or all threads)", default=0, type=int)
+	parser.add_argument("--export", help="Exports all subgraphs to a static bundle in this directory instead of running the server", default=None)
+	parser.add_argument("--layout-cache", help="Layout cache file reused across runs (default: <prefix>.layouts.pickle)", default=None)
+	parser.add_argument("--layout-cache-size", help="Maximum number of cached subgraph layouts, or 0 to disable (default: 10000)", default=10000, type=int)
 	parser.add_argument("--force", help="Overwrites all files", action="store_true")
 	args = parser.parse_args(arguments)	# Get args as args.name
 
@@ -24,20 +32,70 @@ def main(arguments):
 	if threads <= 0 or threads > max_cores:
 		threads = max_cores
 
-	prefix = fasta_file.replace("." + fasta_file.split(".")[-1], "")
+	if fasta_file is None and args.blast is None:
+		parser.error("one of -f/--file or -b/--blast is required")
+
+	input_file = args.blast if args.blast is not None else fasta_file
+	prefix = args.out
+	if prefix is None:
+		if input_file == "-":
+			parser.error("-o/--out is required when reading from stdin")
+		prefix = strip_extensions(input_file)
 
 	blast_file = prefix + ".tsv"
 	graph_file = prefix + ".pickle"
+	layout_cache_file = args.layout_cache if args.layout_cache is not None else prefix + ".layouts.pickle"
 
 	BLAST_COLUMNS = "qacc sacc bitscore evalue sscinames"
 
-	if not os.path.exists(blast_file) or args.force:
+	if args.blast is not None:
+		blast_file = args.blast
+
+	elif not os.path.exists(blast_file) or args.force:
+		if db is None:
+			parser.error("-d/--db is required when running BLAST")
+
 		print("Running BLAST...")
-		subprocess.run('blastn -query {query} -db {db} -out {out} -evalue {evalue} -max_hsps 1 -outfmt "6 {cols}" -num_threads {threads}'.format(query=fasta_file, db=db, evalue=evalue, out=blast_file, cols=BLAST_COLUMNS, threads=threads), shell=True)
-		subprocess.run('(echo "{cols}" && cat {file}) > {file}.tmp && mv {file}.tmp {file}'.format(cols=BLAST_COLUMNS.replace(" ", "\\t"), file=blast_file), shell=True)
+		blast_args = ["blastn", "-db", db, "-out", blast_file, "-evalue", evalue, "-max_hsps", "1", "-outfmt", "6 " + BLAST_COLUMNS, "-num_threads", str(threads)]
+
+		# Plain FASTA files are read by blastn directly, otherwise they are decompressed into its stdin
+		process = None
+		try:
+			if is_plain_file(fasta_file):
+				returncode = subprocess.run(blast_args + ["-query", fasta_file]).returncode
+			else:
+				with open_input(fasta_file, threads) as stream:
+					process = subprocess.Popen(blast_args + ["-query", "-"], stdin=subprocess.PIPE)
+					try:
+						shutil.copyfileobj(stream, process.stdin)
+						process.stdin.close()
+					except BrokenPipeError:
+						pass
+				returncode = process.wait()
+
+		# Stop BLAST if the FASTA file could not be read (e.g. a truncated archive)
+		except BaseException:
+			if process is not None:
+				process.kill()
+				process.wait()
+			_remove_partial(blast_file)
+			raise
+
+		if returncode != 0:
+			_remove_partial(blast_file)
+			sys.exit("BLAST failed with exit code %s" % returncode)
+
+	graph_df = blast_to_graph(blast_file, graph_file, "sscinames", "qacc", args.force, BLAST_COLUMNS.split(" "), threads, layout_cache_file, args.layout_cache_size)
+
+	if args.export is not None:
+		export_graph(graph_file, args.export, threads, args.force)
+	else:
+		subprocess.run("python app.py {graph_file}".format(graph_file = graph_file), shell=True)
 
-	graph_df = blast_to_graph(blast_file, graph_file, "sscinames", "qacc", args.force)
-	subprocess.run("python app.py {graph_file}".format(graph_file = graph_file), shell=True)
+# Remove partial BLAST results so they are not reused by the next run
+def _remove_partial (blast_file):
+	if os.path.exists(blast_file):
+		os.remove(blast_file)
 
 if __name__ == "__main__":
 	main(sys.argv[1:])
\ No newline at end of file
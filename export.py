@@ -0,0 +1,17 @@
+from src.export_graph import export_graph
+import sys
+import argparse
+
+def main(arguments):
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument("graph_file", help="Graph file created by blastgraph.py")
+	parser.add_argument("out_dir", help="Output directory for the static bundle")
+	parser.add_argument("-t", "--threads", help="Number of processes (default: 0, or all threads)", default=0, type=int)
+	parser.add_argument("--force", help="Overwrites an existing bundle", action="store_true")
+	args = parser.parse_args(arguments)
+
+	export_graph(args.graph_file, args.out_dir, args.threads, args.force)
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
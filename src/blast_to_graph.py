@@ -1,15 +1,26 @@
 import pandas as pd
 import numpy as np
 import igraph as ig
+import io
 import os
 import pickle
+from src.open_input import open_input
+from src.layout_cache import LayoutCache
 
-def blast_to_graph (blast_file, graph_file, node_col="qacc", edge_col="sacc", force=False):
+def blast_to_graph (blast_file, graph_file, node_col="qacc", edge_col="sacc", force=False, columns=None, threads=1, layout_cache_file=None, layout_cache_size=10000):
 
 	if not os.path.exists(graph_file) or force:
 		print("Creating graph file from blast results...")
+
+		layout_cache = None
+		if layout_cache_file is not None and layout_cache_size > 0:
+			layout_cache = LayoutCache(layout_cache_file, layout_cache_size)
 	
-		node_df,edge_df = _blast_to_graph(blast_file, node_col, edge_col)
+		node_df,edge_df = _blast_to_graph(blast_file, node_col, edge_col, columns, threads, layout_cache)
+
+		if layout_cache is not None:
+			print("...Reused %s of %s subgraph layouts" % (layout_cache.hits, layout_cache.hits + layout_cache.misses))
+			layout_cache.save()
 
 		print("Saving graph file")
 		with open(graph_file, "wb") as outfile:
@@ -17,12 +28,21 @@ def blast_to_graph (blast_file, graph_file, node_col="qacc", edge_col="sacc", fo
 			pickle.dump(edge_df, outfile)
 
 
-def _blast_to_graph (file, node_col = "qacc", edge_col = "sacc"):
+def _blast_to_graph (file, node_col = "qacc", edge_col = "sacc", columns = None, threads = 1, layout_cache = None):
 
 	print("...Preprocessing BLAST results...")
 
-	# If not, read in data
-	blast = pd.read_csv(file, sep="\t", nrows=500)
+	# Read node and edge names as categories so they are stored once and handled as integer codes
+	#   Names are only looked up again when building the output dataframes
+	blast = read_blast(file, columns, threads,
+		usecols = lambda col: col in [node_col, edge_col, "qacc", "bitscore"],
+		dtype = { node_col: "category", edge_col: "category" })
+
+	node_names = _intern(blast, node_col)
+	_intern(blast, edge_col)
+
+	# Remove hits with missing names
+	blast = blast[(blast[node_col] >= 0) & (blast[edge_col] >= 0)]
 
 	# Keep only best hit for each qacc and sacc
 	blast = blast.groupby([node_col, edge_col]).agg({"bitscore": "max"})
@@ -35,79 +55,47 @@ def _blast_to_graph (file, node_col = "qacc", edge_col = "sacc"):
 	blast = blast[blast["bitscore_perc"] >= 0.9]
 
 
-	node_names = np.array(sorted(blast.index.get_level_values(node_col).unique()))
-	edge_names = sorted(blast.index.get_level_values(edge_col).unique())
-
-	node_edges = blast.reset_index().groupby(node_col).agg({ edge_col: lambda x: sorted(x.unique()) })
-
-	node_num_edges = np.array(len(node_names) * [0])
-
-
 	print("...Finding edges...")
 
-	edges_all = pd.DataFrame(None, columns=["node1", "node2", "edge", "weight"])
-
-	# Iterate through each edge set to find common edges between nodes
-	for i in range(len(node_names)):
-
-		# Get node and the neighbors that need edges
-		node_i = node_names[i]
-		neighbors_i = node_edges.loc[node_i, edge_col]
-
-		for j in range(i + 1, len(node_names)):
+	hits = blast["bitscore_perc"].reset_index()
+	hits.columns = ["node", "edge", "weight"]
 
-			# Get node and the neighbors that need edges
-			node_j = node_names[j]
-			neighbors_j = node_edges.loc[node_j, edge_col]
-
-
-			# Compare sets of neighbors to find shared nodes to create edges
-			shorter = neighbors_i
-			longer = neighbors_j
-			if len(shorter) < len(longer):
-				shorter = neighbors_j
-				longer = neighbors_i
-
-
-			# Iterate through the shorter to find shared nodes
-			for edge_name in shorter:
-				if edge_name in longer:
-
-					weight_i = blast.loc[(node_i,edge_name), "bitscore_perc"]
-					weight_j = blast.loc[(node_j,edge_name), "bitscore_perc"]
-
-					weight_avg = 0.5 * (weight_i + weight_j)
-
-					edges_all.loc[len(edges_all)] = [node_i, node_j, edge_name, weight_avg]
-					node_num_edges[i] += 1
-					node_num_edges[j] += 1
-
-	# Remove nodes with no edges
-	node_names = list(node_names[node_num_edges > 0])
+	# Pair up nodes that share an edge
+	edges_all = hits.merge(hits, on="edge", suffixes=("1", "2"))
+	edges_all = edges_all[edges_all["node1"] < edges_all["node2"]]
+	edges_all["weight"] = 0.5 * (edges_all["weight1"] + edges_all["weight2"])
 
 	# Combine edges between the same nodes
+	edges_all = edges_all.sort_values(["node1", "node2", "edge"])
 	edges_merged = edges_all.groupby(["node1", "node2"], as_index=False).agg({"weight": "sum"})
+	del hits, edges_all
 
-	# Rename nodes by node index
-	edges_merged["node1"] = [node_names.index(n) for n in edges_merged["node1"]]
-	edges_merged["node2"] = [node_names.index(n) for n in edges_merged["node2"]]
+	# Remove nodes with no edges and rename nodes by node index
+	node_ids = np.unique(np.concatenate([edges_merged["node1"].to_numpy(), edges_merged["node2"].to_numpy()]))
+	node1 = np.searchsorted(node_ids, edges_merged["node1"].to_numpy())
+	node2 = np.searchsorted(node_ids, edges_merged["node2"].to_numpy())
 
 	# Create graph from edge and node data
 
 
 	graph = ig.Graph()
-	graph.add_vertices(len(node_names))
-	graph.add_edges([(n1,n2) for n1,n2 in zip(edges_merged["node1"], edges_merged["node2"])])
+	graph.add_vertices(len(node_ids))
+	graph.add_edges(zip(node1.tolist(), node2.tolist()))
 
 	num_vertices = len(graph.vs)
 
-	graph.vs["name"] = node_names
+	graph.vs["id"] = node_ids.tolist()
 	graph.vs["weight"] = num_vertices * [1]
 
-	graph.es["weight"] = edges_merged["weight"]
+	graph.es["weight"] = edges_merged["weight"].tolist()
+
+	node_columns = { col: [] for col in ["weight", "subgraph", "x", "y", "community", "node"] }
+	edge_columns = { col: [] for col in ["source", "target", "weight", "subgraph", "community"] }
 
-	node_df = pd.DataFrame(None, columns=["name", "weight", "subgraph", "x", "y", "community", "node"])
-	edge_df = pd.DataFrame(None, columns=["source", "target", "weight", "subgraph", "community"])
+	# Original node ids contained in each output node row
+	member_rows = []
+	member_ids = []
+	num_rows = 0
 
 	components = graph.connected_components(mode='weak')
 
@@ -121,7 +109,10 @@ def _blast_to_graph (file, node_col = "qacc", edge_col = "sacc"):
 		subgraph.vs["subgraph"] = int(subgraph_index)
 		subgraph.es["subgraph"] = int(subgraph_index)
 
-		layout = subgraph.layout("kamada_kawai")
+		if layout_cache is not None:
+			layout = layout_cache.layout(subgraph, node_names[subgraph.vs["id"]].tolist(), "kamada_kawai")
+		else:
+			layout = subgraph.layout("kamada_kawai")
 		subgraph.vs["x"] = [n[0] for n in layout]
 		subgraph.vs["y"] = [n[1] for n in layout]
 
@@ -149,7 +140,7 @@ def _blast_to_graph (file, node_col = "qacc", edge_col = "sacc"):
 
 			# Add node's group into group map
 			#   Can only combine nodes with equivalent neighbors and communities
-			group_name = str(subgraph.vs[node]["community"]) + "|" + ",".join(map(str, neighbors))
+			group_name = (subgraph.vs[node]["community"], tuple(neighbors))
 
 			if group_name not in node_groups:
 				node_groups[group_name] = []
@@ -161,19 +152,23 @@ def _blast_to_graph (file, node_col = "qacc", edge_col = "sacc"):
 			for i in group:
 				membership[i] = min_idx
 
+		# Keep track of which nodes are collapsed together instead of joining their names
+		member_rows.append(np.array(membership) + num_rows)
+		member_ids.append(np.array(subgraph.vs["id"]))
+		del subgraph.vs["id"]
+
 		# Collapse nodes based on identical neighbors
 		subgraph.contract_vertices(membership, combine_attrs = {
 			"x": "mean", 
 			"y": "mean", 
 			"weight": "sum", 
 			"community": "first", 
-			"subgraph": "first", 
-			"name": lambda x: ",".join(sorted(x))
+			"subgraph": "first"
 		})
 
 		# Combine edges
 		subgraph.simplify(combine_edges={
-			"weight": sum, 
+			"weight": "sum", 
 			"subgraph": "first", 
 			"community": "first"
 		})
@@ -184,12 +179,18 @@ def _blast_to_graph (file, node_col = "qacc", edge_col = "sacc"):
 		#verts_to_delete = [n for n in range(len(subgraph.vs)) if subgraph.vs["name"][n] == "" ]
 		#subgraph.delete_vertices(verts_to_delete)
 
-		# Create dataframes for nodes and edges
-		subgraph_node_df = pd.DataFrame({attr: subgraph.vs[attr] for attr in subgraph.vertex_attributes()})
-		subgraph_node_df.index.name = "node"
+		# Collect node and edge attributes as arrays
+		#   Missing values (e.g. communities of edges between communities) become NaN
+		for attr in ["weight", "subgraph", "x", "y", "community"]:
+			node_columns[attr].append(np.array(subgraph.vs[attr], dtype=float))
+		node_columns["node"].append(np.array(subgraph.vs["node"], dtype=np.int64))
+		num_rows += len(subgraph.vs)
 
-		subgraph_edge_df = subgraph.get_edge_dataframe()
-		subgraph_edge_df.index.name = "edge"
+		edge_list = np.array(subgraph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+		edge_columns["source"].append(edge_list[:, 0])
+		edge_columns["target"].append(edge_list[:, 1])
+		for attr in ["weight", "subgraph", "community"]:
+			edge_columns[attr].append(np.array(subgraph.es[attr] if len(subgraph.es) > 0 else [], dtype=float))
 
 		# Removes extraneous edges caused by graph processing
 		#rows_to_delete = []
@@ -201,20 +202,71 @@ def _blast_to_graph (file, node_col = "qacc", edge_col = "sacc"):
 		#		rows_to_delete.append(i)
 		#edge_df.drop(rows_to_delete, inplace=True)
 
+	node_df = pd.DataFrame({ col: np.concatenate(arrays) if len(arrays) > 0 else [] for col,arrays in node_columns.items() })
+	edge_df = pd.DataFrame({ col: np.concatenate(arrays) if len(arrays) > 0 else [] for col,arrays in edge_columns.items() })
 
-		if len(node_df) == 0:
-			node_df = subgraph_node_df
-		else:
-			node_df = pd.concat([node_df, subgraph_node_df], ignore_index=True)
-
-		if len(edge_df) == 0:
-			edge_df = subgraph_edge_df
-		else:
-			edge_df = pd.concat([edge_df, subgraph_edge_df], ignore_index=True)
+	# Materialize names of collapsed nodes, sorted by name since node ids follow name order
+	names = pd.Series([], dtype=str)
+	if len(member_rows) > 0:
+		members = pd.DataFrame({ "row": np.concatenate(member_rows), "id": np.concatenate(member_ids) }).sort_values(["row", "id"])
+		names = pd.Series(node_names[members["id"].to_numpy()], index=members["row"].to_numpy()).groupby(level=0).agg(",".join)
+	node_df.insert(0, "name", names.reindex(range(len(node_df)), fill_value="").to_numpy())
 
-	node_df.to_csv("nodes.tsv", sep="\t")
-	edge_df.to_csv("edges.tsv", sep="\t")
+	node_df.to_csv("nodes.tsv", sep="\t", chunksize=5000)
+	edge_df.to_csv("edges.tsv", sep="\t", chunksize=5000)
 
 	return node_df,edge_df
 
-	
\ No newline at end of file
+
+# Replace a categorical column by its integer codes and return the names by code
+#   Categories are kept in sorted order so code order matches name order
+
+def _intern (df, col):
+	categories = df[col].cat.categories
+	if not categories.is_monotonic_increasing:
+		df[col] = df[col].cat.reorder_categories(sorted(categories))
+		categories = df[col].cat.categories
+
+	df[col] = df[col].cat.codes
+	return np.asarray(categories, dtype=object)
+
+
+# Read BLAST results from a file, compressed file, or stdin ("-")
+#   Headerless outfmt 6 tables need the column names given by columns.
+#   A header row matching columns is skipped so tables with or without a header both work.
+
+def read_blast (file, columns = None, threads = 1, **kwargs):
+
+	with open_input(file, threads) as stream:
+
+		if columns is not None:
+
+			# Read the whole first line, then pass it back to read_csv together with the rest of the stream
+			first_line = stream.readline()
+			stream = io.BufferedReader(_PrefixedReader(first_line, stream))
+
+			if first_line.rstrip(b"\r\n").decode().split("\t") != list(columns):
+				return pd.read_csv(stream, sep="\t", header=None, names=list(columns), nrows=500, **kwargs)
+
+		return pd.read_csv(stream, sep="\t", nrows=500, **kwargs)
+
+
+# Binary stream that returns prefix before reading from stream
+
+class _PrefixedReader (io.RawIOBase):
+
+	def __init__ (self, prefix, stream):
+		self.prefix = prefix
+		self.offset = 0
+		self.stream = stream
+
+	def readable (self):
+		return True
+
+	def readinto (self, buffer):
+		if self.offset < len(self.prefix):
+			size = min(len(buffer), len(self.prefix) - self.offset)
+			buffer[:size] = self.prefix[self.offset:self.offset + size]
+			self.offset += size
+			return size
+		return self.stream.readinto(buffer)
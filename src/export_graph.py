@@ -0,0 +1,244 @@
+import os
+import json
+import pickle
+import multiprocessing
+import plotly.offline
+from src.plot_graph import plot_subgraph, index_subgraph, neighbor_records, collapse_names
+
+# Static export of all subgraphs
+#   Writes a bundle that can be opened from disk without running the Dash server:
+#      index.html              <- Viewer page with the list of groups
+#      plotly.min.js           <- Bundled copy of plotly.js
+#      subgraphs/<index>.js    <- Figure and neighbor tables for one subgraph
+#
+#   Subgraph files are JSON wrapped in a function call so that the viewer can load
+#   them lazily with a <script> tag, which browsers allow for file:// pages
+
+
+def export_graph (graph_file, out_dir, threads=0, force=False):
+
+	index_file = os.path.join(out_dir, "index.html")
+
+	# Keep an existing bundle unless the graph file has changed since it was exported
+	if os.path.exists(index_file) and not force:
+		if os.path.getmtime(index_file) >= os.path.getmtime(graph_file):
+			print("Skipping export, " + index_file + " is up to date (use --force to overwrite)")
+			return
+
+	print("Exporting subgraphs to " + out_dir + "...")
+
+	with open(graph_file, "rb") as infile:
+		node_df = pickle.load(infile)
+		edge_df = pickle.load(infile)
+
+	max_cores = multiprocessing.cpu_count()
+	if threads <= 0 or threads > max_cores:
+		threads = max_cores
+
+	subgraph_dir = os.path.join(out_dir, "subgraphs")
+	os.makedirs(subgraph_dir, exist_ok=True)
+
+	# Remove subgraph files from a previous export
+	for file in os.listdir(subgraph_dir):
+		if file.endswith(".js"):
+			os.remove(os.path.join(subgraph_dir, file))
+
+	# Pair up the nodes and edges of each subgraph so each task only carries its own rows
+	edge_groups = dict(tuple(edge_df.groupby("subgraph")))
+	tasks = [(int(subgraph_index), node_subdf, edge_groups.get(subgraph_index, edge_df.iloc[0:0]), subgraph_dir)
+		for subgraph_index,node_subdf in node_df.groupby("subgraph")]
+
+	summaries = []
+	with multiprocessing.Pool(threads) as pool:
+		for summary in pool.imap_unordered(_export_subgraph, tasks, chunksize=max(1, len(tasks) // (4 * threads))):
+			summaries.append(summary)
+
+	summaries = sorted(summaries, key = lambda x: x["index"])
+
+	with open(os.path.join(out_dir, "plotly.min.js"), "w") as outfile:
+		outfile.write(plotly.offline.get_plotlyjs())
+
+	with open(index_file, "w") as outfile:
+		outfile.write(INDEX_HTML.replace("__SUBGRAPHS__", json.dumps(summaries)))
+
+	print("...Exported %s subgraphs" % len(summaries))
+
+
+def _export_subgraph (task):
+
+	subgraph_index, node_subdf, edge_subdf, subgraph_dir = task
+
+	fig = plot_subgraph(node_subdf, edge_subdf)
+
+	# Neighbor tables and names are stored by point index to match the node trace
+	node_rows,adjacency = index_subgraph(node_subdf, edge_subdf)
+	nodes = []
+	for node_id,name in zip(node_subdf["node"], node_subdf["name"]):
+		nodes.append({
+			"id": int(node_id),
+			"name": collapse_names(name, sep="\n"),
+			"neighbors": neighbor_records(node_subdf, node_id, node_rows, adjacency)
+		})
+
+	data = {
+		"figure": json.loads(fig.to_json()),
+		"nodes": nodes
+	}
+
+	with open(os.path.join(subgraph_dir, "%s.js" % subgraph_index), "w") as outfile:
+		outfile.write("BLASTGraph.load(%s, %s);\n" % (subgraph_index, json.dumps(data)))
+
+	return {
+		"index": subgraph_index,
+		"nodes": len(node_subdf),
+		"edges": len(edge_subdf),
+		"weight": float(node_subdf["weight"].sum())
+	}
+
+
+INDEX_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>BLASTGraph</title>
+<script src="plotly.min.js"></script>
+<style>
+	body { font-family: sans-serif; margin: 0; }
+	#main { display: flex; width: 100%; }
+	#groups { width: 180px; height: 100vh; overflow-y: scroll; border-right: 1px solid black; }
+	#groups div { padding: 3px 8px; cursor: pointer; }
+	#groups div.active { background: beige; }
+	#plot { flex: 1; padding: 15px; position: sticky; top: 0px; }
+	#fig { max-height: 80vh; aspect-ratio: 1/1; }
+	#nav { width: 90%; display: flex; margin: auto; text-align: center; }
+	#nav div { flex: 1; border: 1px solid black; }
+	#clicked_node { white-space: pre-wrap; max-height: 100px; min-height: 25px; overflow-y: scroll; padding: 5px 5px 5px 10px; background: beige; border: 1px solid black; margin-top: 10px; }
+	#table { flex: 1; text-align: center; }
+	table { width: 90%; margin: auto; border-collapse: collapse; }
+	td, th { white-space: pre-line; text-align: right; vertical-align: top; border: 1px solid #ddd; padding: 3px; }
+	td:first-child, th:first-child { text-align: left; }
+	tr:hover { background: pink; cursor: pointer; }
+</style>
+</head>
+<body>
+<div id="main">
+	<div id="groups"></div>
+	<div id="plot">
+		<div id="fig"></div>
+		<div id="nav">
+			<div><button id="subgraph-prev">&lt;&lt;&lt;</button></div>
+			<div>Group <span id="subgraph-index">0</span> / <span id="subgraph-maxindex">0</span></div>
+			<div><button id="subgraph-next">&gt;&gt;&gt;</button></div>
+		</div>
+		<div id="clicked_node"></div>
+	</div>
+	<div id="table">
+		<h3>Neighbor information</h3>
+		<table>
+			<thead><tr><th>Name</th><th>Node weight</th><th>Edge weight</th></tr></thead>
+			<tbody id="edge_table"></tbody>
+		</table>
+	</div>
+</div>
+<script>
+var BLASTGraph = (function () {
+
+	var subgraphs = __SUBGRAPHS__;
+	var cache = {};
+	var current = -1;
+
+	// Subgraph files call BLASTGraph.load when their script tag finishes loading
+	function load (index, data) {
+		cache[index] = data;
+		if (index == subgraphs[current].index) {
+			draw(data);
+		}
+	}
+
+	function show (position) {
+		if (position < 0 || position >= subgraphs.length) {
+			return;
+		}
+
+		var items = document.getElementById("groups").children;
+		if (current > -1) {
+			items[current].className = "";
+		}
+		items[position].className = "active";
+		current = position;
+
+		document.getElementById("subgraph-index").textContent = position + 1;
+		document.getElementById("clicked_node").textContent = "";
+		document.getElementById("edge_table").innerHTML = "";
+
+		var index = subgraphs[position].index;
+		if (index in cache) {
+			draw(cache[index]);
+		}
+		else {
+			var script = document.createElement("script");
+			script.src = "subgraphs/" + index + ".js";
+			document.body.appendChild(script);
+		}
+	}
+
+	function draw (data) {
+		var fig = document.getElementById("fig");
+		Plotly.newPlot(fig, data.figure.data, data.figure.layout);
+		fig.on("plotly_click", function (event) {
+			if (event.points.length == 1 && event.points[0].curveNumber == fig.data.length - 1) {
+				select(data, event.points[0].pointIndex);
+			}
+		});
+	}
+
+	function select (data, point_index) {
+		var fig = document.getElementById("fig");
+		var node = data.nodes[point_index];
+
+		// Highlight clicked node and its neighbors
+		var colors = data.nodes.map(function () { return "white"; });
+		colors[point_index] = "yellow";
+		node.neighbors.forEach(function (neighbor) { colors[neighbor.point_index] = "red"; });
+		Plotly.restyle(fig, { "marker.color": [colors] }, [fig.data.length - 1]);
+
+		document.getElementById("clicked_node").textContent = node.name;
+
+		var table = document.getElementById("edge_table");
+		table.innerHTML = "";
+		node.neighbors.forEach(function (neighbor) {
+			var row = document.createElement("tr");
+			["Name", "Node weight", "Edge weight"].forEach(function (column) {
+				var cell = document.createElement("td");
+				cell.textContent = neighbor[column];
+				row.appendChild(cell);
+			});
+			row.addEventListener("click", function () { select(data, neighbor.point_index); });
+			table.appendChild(row);
+		});
+	}
+
+	document.addEventListener("DOMContentLoaded", function () {
+		var groups = document.getElementById("groups");
+		subgraphs.forEach(function (subgraph, position) {
+			var item = document.createElement("div");
+			item.textContent = "Group " + (position + 1) + " (" + subgraph.nodes + " nodes)";
+			item.addEventListener("click", function () { show(position); });
+			groups.appendChild(item);
+		});
+
+		document.getElementById("subgraph-maxindex").textContent = subgraphs.length;
+		document.getElementById("subgraph-prev").addEventListener("click", function () { show(current - 1); });
+		document.getElementById("subgraph-next").addEventListener("click", function () { show(current + 1); });
+
+		if (subgraphs.length > 0) {
+			show(0);
+		}
+	});
+
+	return { load: load };
+})();
+</script>
+</body>
+</html>
+"""
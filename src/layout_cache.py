@@ -0,0 +1,68 @@
+import os
+import pickle
+import hashlib
+from collections import OrderedDict
+
+# Persistent cache of subgraph layouts
+#   Layouts are keyed by a hash of the subgraph's node names and weighted edges, so a
+#   component with the same structure in a later run reuses its coordinates.
+#   Entries are stored by node name and evicted least recently used first once
+#   there are more than max_entries.
+
+class LayoutCache:
+
+	def __init__ (self, cache_file, max_entries=10000):
+		self.cache_file = cache_file
+		self.max_entries = max_entries
+		self.layouts = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+		if os.path.exists(cache_file):
+			with open(cache_file, "rb") as infile:
+				self.layouts = pickle.load(infile)
+
+		# The cache may have been saved with a larger size limit
+		self._evict()
+
+
+	# Hash node names and edges by name so the key does not depend on vertex order
+	def key (self, subgraph, names):
+		edges = sorted(tuple(sorted((names[edge.source], names[edge.target]))) + (round(edge["weight"], 6),) for edge in subgraph.es)
+
+		digest = hashlib.sha256()
+		digest.update(repr(sorted(names)).encode())
+		digest.update(repr(edges).encode())
+		return digest.hexdigest()
+
+
+	# Returns the cached layout of the subgraph, or computes and stores it
+	#   names gives the name of each vertex of the subgraph
+	def layout (self, subgraph, names, algorithm="kamada_kawai"):
+		key = algorithm + ":" + self.key(subgraph, names)
+
+		if key in self.layouts:
+			self.hits += 1
+			self.layouts.move_to_end(key)
+			coords = self.layouts[key]
+			return [coords[name] for name in names]
+
+		self.misses += 1
+		layout = subgraph.layout(algorithm)
+		self.layouts[key] = { name: tuple(coord) for name,coord in zip(names, layout) }
+
+		self._evict()
+
+		return [list(coord) for coord in layout]
+
+
+	# Remove least recently used layouts until the cache fits in max_entries
+	def _evict (self):
+		while len(self.layouts) > self.max_entries:
+			self.layouts.popitem(last=False)
+
+
+	def save (self):
+		with open(self.cache_file + ".tmp", "wb") as outfile:
+			pickle.dump(self.layouts, outfile)
+		os.replace(self.cache_file + ".tmp", self.cache_file)
@@ -0,0 +1,180 @@
+import io
+import os
+import sys
+import gzip
+import bz2
+import lzma
+import shutil
+import subprocess
+import threading
+
+# Open a possibly compressed input file as a binary stream
+#   Compression is detected from the leading bytes so stdin ("-") works the same way as files.
+#   Data is decompressed while it is read, so nothing is written to disk.
+#   With threads > 1, gzip and zstd are decompressed by pigz/zstd in a separate process if available,
+#   so decompression runs in parallel with parsing (pigz also uses extra threads).
+
+MAGIC = {
+	b"\x1f\x8b": "gzip",
+	b"\x28\xb5\x2f\xfd": "zstd",
+	b"BZh": "bz2",
+	b"\xfd7zXZ\x00": "xz"
+}
+
+COMPRESSION_EXTENSIONS = [".gz", ".zst", ".bz2", ".xz"]
+
+
+def open_input (path, threads=1):
+	if path == "-":
+		stream = sys.stdin.buffer
+	else:
+		stream = open(path, "rb")
+
+	compression = detect_compression(stream)
+
+	if compression is None:
+		return stream
+
+	if threads > 1:
+		tool = { "gzip": ["pigz", "-dc", "-p", str(threads)], "zstd": ["zstd", "-dc"] }.get(compression)
+		if tool is not None and shutil.which(tool[0]) is not None:
+			return _pipe_through(tool, stream)
+
+	if compression == "gzip":
+		return gzip.GzipFile(fileobj=stream)
+	elif compression == "bz2":
+		return bz2.BZ2File(stream)
+	elif compression == "xz":
+		return lzma.LZMAFile(stream)
+
+	# zstd is only needed for .zst inputs
+	try:
+		import zstandard
+	except ImportError:
+		if shutil.which("zstd") is None:
+			raise ImportError("Reading zstd compressed files requires the zstandard package or the zstd command")
+		return _pipe_through(["zstd", "-dc"], stream)
+
+	return io.BufferedReader(_ZstdReader(stream, zstandard.ZstdDecompressor()))
+
+
+def detect_compression (stream):
+	head = stream.peek(6)[:6]
+	for magic,compression in MAGIC.items():
+		if head.startswith(magic):
+			return compression
+	return None
+
+
+# Run a decompression command on a stream
+#   The stream is copied to the command from a thread because peeked bytes are
+#   already buffered in Python and would be skipped if the file descriptor was passed
+
+def _pipe_through (command, stream):
+	process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+	def copy ():
+		try:
+			shutil.copyfileobj(stream, process.stdin)
+		except BrokenPipeError:
+			pass
+		finally:
+			process.stdin.close()
+			stream.close()
+
+	threading.Thread(target=copy, daemon=True).start()
+	return io.BufferedReader(_ProcessReader(process, command))
+
+
+# Read the output of a decompression command
+#   The exit code is checked at the end of the output so corrupt or truncated files raise an error.
+#   Closing before the end (e.g. when only the first rows are read) stops the command instead.
+
+class _ProcessReader (io.RawIOBase):
+
+	def __init__ (self, process, command):
+		self.process = process
+		self.command = command
+
+	def readable (self):
+		return True
+
+	def readinto (self, buffer):
+		size = self.process.stdout.readinto(buffer)
+		if size == 0:
+			self._check(self.process.wait())
+		return size
+
+	def close (self):
+		if not self.closed:
+			returncode = self.process.poll()
+			self.process.stdout.close()
+			if returncode is None:
+				self.process.kill()
+			self.process.wait()
+			super().close()
+			self._check(returncode)
+
+	def _check (self, returncode):
+		if returncode is not None and returncode != 0:
+			raise subprocess.CalledProcessError(returncode, self.command)
+
+
+# Decompress a zstd stream frame by frame
+#   Unlike zstandard's stream_reader, a stream that ends in the middle of a frame raises an error
+
+class _ZstdReader (io.RawIOBase):
+
+	def __init__ (self, stream, decompressor):
+		self.stream = stream
+		self.decompressor = decompressor
+		self.decompressobj = decompressor.decompressobj()
+		self.data = bytearray()
+
+	def readable (self):
+		return True
+
+	def readinto (self, buffer):
+		while len(self.data) == 0:
+			compressed = self.stream.read(io.DEFAULT_BUFFER_SIZE)
+			if len(compressed) == 0:
+				if not self.decompressobj.eof:
+					raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+				return 0
+
+			# Start a new decompressor for each following frame
+			while len(compressed) > 0:
+				if self.decompressobj.eof:
+					self.decompressobj = self.decompressor.decompressobj()
+				self.data += self.decompressobj.decompress(compressed)
+				compressed = self.decompressobj.unused_data if self.decompressobj.eof else b""
+
+		size = min(len(buffer), len(self.data))
+		buffer[:size] = self.data[:size]
+
+		# Deleting from the front of a bytearray does not copy the rest of the data
+		del self.data[:size]
+		return size
+
+	def close (self):
+		if not self.closed:
+			self.stream.close()
+			super().close()
+
+
+# Check whether a file can be passed to other programs by path as-is
+def is_plain_file (path):
+	if path == "-":
+		return False
+	with open(path, "rb") as stream:
+		return detect_compression(stream) is None
+
+
+# Remove compression and file extensions to get the output prefix
+#   Example: reads.fasta.gz -> reads
+
+def strip_extensions (path):
+	root,ext = os.path.splitext(path)
+	if ext in COMPRESSION_EXTENSIONS:
+		root,ext = os.path.splitext(root)
+	return root
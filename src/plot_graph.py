@@ -31,6 +31,46 @@ def collapse_names (name_string, sep=","):
 	return sep.join(new_names)
 
 
+# Index the nodes and edges of a subgraph for neighbor lookups
+#   node_rows maps node ids to their row (point index) in node_subdf
+#   adjacency maps node ids to (edge id, neighbor id, edge weight) in edge order
+
+def index_subgraph (node_subdf, edge_subdf):
+	node_rows = { node: row for row,node in enumerate(node_subdf["node"]) }
+	adjacency = { node: [] for node in node_rows }
+
+	for edge_id,source,target,weight in zip(edge_subdf.index, edge_subdf["source"], edge_subdf["target"], edge_subdf["weight"]):
+		adjacency.setdefault(source, []).append((edge_id, target, weight))
+		adjacency.setdefault(target, []).append((edge_id, source, weight))
+
+	return node_rows,adjacency
+
+
+# Build the neighbor table rows for a node in a subgraph
+#   Rows are sorted by edge weight and each row keeps the point index of
+#   the neighbor in node_subdf so that it can be highlighted in the plot
+
+def neighbor_records (node_subdf, node_id, node_rows, adjacency, sep="\n"):
+	records = []
+	for edge_id,adj_node_id,edge_weight in adjacency.get(node_id, []):
+
+		if adj_node_id not in node_rows:
+			continue
+
+		node_row = node_rows[adj_node_id]
+
+		records.append({
+			"id": int(adj_node_id),
+			"point_index": node_row,
+			"edge_id": int(edge_id),
+			"Name": collapse_names(node_subdf["name"].iloc[node_row], sep=sep),
+			"Node weight": "{:10.3f}".format(node_subdf["weight"].iloc[node_row]),
+			"Edge weight": "{:10.3f}".format(edge_weight)
+		})
+
+	return sorted(records, key = lambda x: x["Edge weight"], reverse=True)
+
+
 
 
 def plot_subgraph (node_subdf, edge_subdf):